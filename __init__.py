@@ -22,102 +22,1073 @@ bl_info = {
     "category": "Breath of the Wild",
 }
 
+import concurrent.futures
+import hashlib
+import heapq
+import itertools
 import os
 import subprocess
-from math import radians
+import tempfile
+import time
+from math import pi, radians
 
+import bmesh
 import bpy
 import mathutils
+import numpy as np
 from bpy.props import (
     BoolProperty,
+    CollectionProperty,
     EnumProperty,
     FloatProperty,
     IntProperty,
     StringProperty,
 )
-from bpy.types import Operator
+from bpy.types import Operator, PropertyGroup, UIList
 from bpy_extras.io_utils import ExportHelper, ImportHelper
 
 
-def physics_to_objs(self, context, filepath) -> list:
-    filepath_obj_template = (
-        filepath.replace(".temp", "")
-        .replace(".yml", "")
-        .replace(".bphysics", "")
-        .replace(".physics", "")
-        + "_{}.obj"
-    )
-    obj_template = "o {}_Physics\n"
-    vert_template = "v {} {} {}\n"
-
-    with open(filepath, "r") as f:
-        lines = f.readlines()
-
-    outputs = []
-    object_names = []
-    output = ""
-
-    for line in lines:
-        line = line.lstrip()
-        if line.startswith("rigid_body_name"):
-            if output:
-                outputs.append(output)
-                output = ""
-            obj_name = line.split(" ")[-1].rstrip("\n")
-            output += obj_template.format(obj_name)
-            object_names.append(obj_name)
-        elif line.startswith("vertex_") and not line.startswith("vertex_num"):
-            split = line.split("[")
-            strip = split[1].rstrip("\n")
-            strip = strip.rstrip("]")
-            coords = strip.split(", ")
-            output += vert_template.format(*coords)
-    else:
-        outputs.append(output)
+CACHE_VERSION = 3
+CACHE_SIZE_LIMIT = 256 * 1024 * 1024
+
+import_state = {}
+
+
+def index_physics(filepath) -> list:
+    # A single pass that only records where each rigid body starts and what
+    # it holds; the vertices are decoded later by seeking to those offsets
+    index = []
+    offset = 0
+    with open(filepath, "rb") as f:
+        for line in f:
+            stripped = line.lstrip()
+            if stripped.startswith(b"rigid_body_name"):
+                if index:
+                    index[-1]["length"] = offset - index[-1]["offset"]
+                name = stripped.split(b" ")[-1].rstrip(b"\r\n").decode("utf-8")
+                index.append(
+                    {
+                        "name": name,
+                        "shape_num": 0,
+                        "vertex_num": 0,
+                        "materials": [],
+                        "offset": offset,
+                        "length": 0,
+                    }
+                )
+            elif index:
+                if stripped.startswith(b"shape_type"):
+                    index[-1]["shape_num"] += 1
+                elif stripped.startswith(b"vertex_") and not stripped.startswith(
+                    b"vertex_num"
+                ):
+                    index[-1]["vertex_num"] += 1
+                elif stripped.startswith(b"material:"):
+                    material = stripped.split(b" ")[-1].rstrip(b"\r\n").decode("utf-8")
+                    if material not in index[-1]["materials"]:
+                        index[-1]["materials"].append(material)
+            offset += len(line)
+    if index:
+        index[-1]["length"] = offset - index[-1]["offset"]
+    return index
+
+
+def read_rigid_bodies(filepath, index) -> list:
+    vertices = []
+    with open(filepath, "rb") as f:
+        for entry in index:
+            f.seek(entry["offset"])
+            coordinates = []
+            for line in f.read(entry["length"]).decode("utf-8").splitlines():
+                line = line.lstrip()
+                if line.startswith("vertex_") and not line.startswith("vertex_num"):
+                    split = line.split("[")
+                    strip = split[1].rstrip("]")
+                    coordinates.append([float(co) for co in strip.split(", ")])
+            vertices.append(np.array(coordinates, dtype=np.float32).reshape(-1, 3))
+    return vertices
+
+
+def create_physics_objects(context, object_names, vertices):
+    for obj_name, coordinates in zip(object_names, vertices):
+        # Y-up physics space to Blender's Z-up, as the OBJ importer did
+        coordinates = np.column_stack(
+            (coordinates[:, 0], -coordinates[:, 2], coordinates[:, 1])
+        )
+        mesh = bpy.data.meshes.new(f"{obj_name}_Physics")
+        mesh.vertices.add(len(coordinates))
+        mesh.vertices.foreach_set("co", coordinates.ravel())
+        mesh.update()
+        obj = bpy.data.objects.new(mesh.name, mesh)
+        context.collection.objects.link(obj)
+        obj.select_set(True)
+
+
+def cache_directory() -> str:
+    return bpy.utils.user_resource("CONFIG", path="botw_physics_cache", create=True)
+
+
+def cache_path(filepath) -> str:
+    stat = os.stat(filepath)
+    with open(filepath, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    key = "{}|{}|{}|{}|{}".format(
+        CACHE_VERSION,
+        os.path.realpath(filepath),
+        stat.st_size,
+        stat.st_mtime_ns,
+        digest,
+    )
+    return os.path.join(
+        cache_directory(), hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npz"
+    )
 
-    filepaths_obj = []
-    for output, obj_name in zip(outputs, object_names):
-        filepath_obj = filepath_obj_template.format(obj_name)
-        with open(filepath_obj, "w") as f:
-            f.write(output)
-        filepaths_obj.append(filepath_obj)
-    return filepaths_obj
 
+def load_cached_index(filepath_cache):
+    if not os.path.exists(filepath_cache):
+        return None
+    try:
+        with np.load(filepath_cache) as cached:
+            index = [
+                {
+                    "name": name,
+                    "shape_num": shape_num,
+                    "vertex_num": vertex_num,
+                    "materials": materials.split(", ") if materials else [],
+                    "offset": offset,
+                    "length": length,
+                }
+                for name, shape_num, vertex_num, materials, offset, length in zip(
+                    cached["names"].tolist(),
+                    cached["shape_counts"].tolist(),
+                    cached["vertex_counts"].tolist(),
+                    cached["materials"].tolist(),
+                    cached["offsets"].tolist(),
+                    cached["lengths"].tolist(),
+                )
+            ]
+    except Exception as e:
+        print(e)
+        return None
+    os.utime(filepath_cache)
+    return index
 
-def parse_physics(self, context, filepath):
-    if filepath.endswith(".bphysics"):
-        filepath_yml = filepath + ".yml.temp"
-        try:
-            command = "aamp {} {}".format(filepath, filepath_yml)
-            print(subprocess.check_output(command, shell=True))
 
-        except Exception as e:
-            print(e)
-            self.report(
-                {"ERROR"}, "Make sure you have AAMP installed (pip install aamp)",
-            )
-            return {"CANCELLED"}
-    else:
-        filepath_yml = filepath
+def load_cached_vertices(filepath_cache, selection) -> dict:
+    # Each rigid body is its own member of the archive and np.load only reads
+    # the members that are accessed, so unpicked bodies are never decoded
+    if not os.path.exists(filepath_cache):
+        return {}
+    try:
+        with np.load(filepath_cache) as cached:
+            return {
+                i: cached[f"body_{i}"] for i in selection if f"body_{i}" in cached.files
+            }
+    except Exception as e:
+        print(e)
+        return {}
+
+
+def store_cached_physics(filepath_cache, index, vertices: dict):
+    # Bodies cached by an earlier import of the same file are kept
+    vertices = {**load_cached_vertices(filepath_cache, range(len(index))), **vertices}
+    np.savez(
+        filepath_cache,
+        names=np.array([entry["name"] for entry in index], dtype=str),
+        shape_counts=np.array([entry["shape_num"] for entry in index], dtype=np.int64),
+        vertex_counts=np.array(
+            [entry["vertex_num"] for entry in index], dtype=np.int64
+        ),
+        materials=np.array(
+            [", ".join(entry["materials"]) for entry in index], dtype=str
+        ),
+        offsets=np.array([entry["offset"] for entry in index], dtype=np.int64),
+        lengths=np.array([entry["length"] for entry in index], dtype=np.int64),
+        **{f"body_{i}": coordinates for i, coordinates in vertices.items()},
+    )
+
+    # Evict the least recently used files once the cache is over its limit
+    entries = [
+        entry for entry in os.scandir(cache_directory()) if entry.name.endswith(".npz")
+    ]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    size = 0
+    for entry in entries:
+        size += entry.stat().st_size
+        if size > CACHE_SIZE_LIMIT and entry.path != filepath_cache:
+            os.remove(entry.path)
+
+
+def purge_physics_cache(self, context):
+    count = 0
+    size = 0
+    for entry in os.scandir(cache_directory()):
+        if entry.name.endswith(".npz"):
+            size += entry.stat().st_size
+            os.remove(entry.path)
+            count += 1
+    self.report(
+        {"INFO"}, f"Removed {count} cached files ({size / 1024 / 1024:.1f} MiB)"
+    )
+    return {"FINISHED"}
+
+
+def decode_physics(self, filepath, filepath_yml):
+    if not filepath.endswith(".bphysics"):
+        return filepath
+    try:
+        command = "aamp {} {}".format(filepath, filepath_yml)
+        print(subprocess.check_output(command, shell=True))
+
+    except Exception as e:
+        print(e)
+        self.report(
+            {"ERROR"}, "Make sure you have AAMP installed (pip install aamp)",
+        )
+        return None
+    return filepath_yml
+
 
-    filepaths_obj = physics_to_objs(self, context, filepath_yml)
-    if filepath_yml.endswith(".temp"):
+def decode_physics_temp(self, filepath):
+    fd, filepath_temp = tempfile.mkstemp(suffix=".yml.temp")
+    os.close(fd)
+    filepath_yml = decode_physics(self, filepath, filepath_temp)
+    if filepath_yml != filepath_temp:
+        os.remove(filepath_temp)
+    return filepath_yml
+
+
+def parse_physics(self, context, filepath, use_cache: bool = True):
+    index = index_physics_file(self, context, filepath, use_cache)
+    if index is None:
+        return {"CANCELLED"}
+    return load_rigid_bodies(self, context, list(range(len(index))))
+
+
+def clear_import_state():
+    filepath_yml = import_state.get("filepath_yml")
+    if filepath_yml and filepath_yml.endswith(".temp") and os.path.exists(filepath_yml):
         os.remove(filepath_yml)
+    import_state.clear()
 
+
+def index_physics_file(self, context, filepath, use_cache: bool = True):
+    clear_import_state()
+    filepath_cache = cache_path(filepath) if use_cache else None
+    index = load_cached_index(filepath_cache) if use_cache else None
+    if index is not None:
+        import_state.update(
+            filepath=filepath, filepath_cache=filepath_cache, index=index
+        )
+        return index
+
+    filepath_yml = decode_physics_temp(self, filepath)
+    if not filepath_yml:
+        return None
+    import_state.update(
+        filepath=filepath, filepath_yml=filepath_yml, filepath_cache=filepath_cache
+    )
     try:
-        for filepath_obj in filepaths_obj:
-            bpy.ops.import_scene.obj("EXEC_DEFAULT", filepath=filepath_obj)
+        index = index_physics(filepath_yml)
+        if use_cache:
+            store_cached_physics(filepath_cache, index, {})
+    except Exception as e:
+        print(e)
+        self.report({"ERROR"}, f"{e}")
+        clear_import_state()
+        return None
+    import_state["index"] = index
+    return index
+
+
+def load_rigid_bodies(self, context, selection: list):
+    index = import_state["index"]
+    filepath_cache = import_state.get("filepath_cache")
+    try:
+        vertices = {}
+        if filepath_cache:
+            vertices = load_cached_vertices(filepath_cache, selection)
+        missing = [i for i in selection if i not in vertices]
+        if missing:
+            # Bodies that are not cached yet are read by offset from the
+            # decoded YAML, which is decoded again if only the index was cached
+            if "filepath_yml" not in import_state:
+                filepath_yml = decode_physics_temp(self, import_state["filepath"])
+                if not filepath_yml:
+                    return {"CANCELLED"}
+                import_state["filepath_yml"] = filepath_yml
+            read = read_rigid_bodies(
+                import_state["filepath_yml"], [index[i] for i in missing]
+            )
+            vertices.update(zip(missing, read))
+            if filepath_cache:
+                store_cached_physics(filepath_cache, index, dict(zip(missing, read)))
+        create_physics_objects(
+            context,
+            [index[i]["name"] for i in selection],
+            [vertices[i] for i in selection],
+        )
     except Exception as e:
         print(e)
         self.report({"ERROR"}, f"{e}")
         return {"CANCELLED"}
     finally:
-        for filepath_obj in filepaths_obj:
-            os.remove(filepath_obj)
-    self.report({"INFO"}, "Completed successfully")
+        clear_import_state()
+    self.report({"INFO"}, f"Loaded {len(selection)} rigid bodies")
     return {"FINISHED"}
 
 
+def hull_vertices(hull) -> list:
+    mtx = mathutils.Matrix.Rotation(radians(-90.0), 4, "X") @ hull.matrix_world
+    return [mtx @ v.co for v in hull.data.vertices]
+
+
+def bounding_box(vertices) -> tuple:
+    if not vertices:
+        return mathutils.Vector((0.0, 1.0, 0.0)), mathutils.Vector((2.0, 2.0, 2.0))
+    lower = mathutils.Vector([min(co[i] for co in vertices) for i in range(3)])
+    upper = mathutils.Vector([max(co[i] for co in vertices) for i in range(3)])
+    return (lower + upper) / 2, upper - lower
+
+
+def collect_shapes(obj, hull_objects) -> list:
+    obj_material = obj.get("botw_material") if obj.get("botw_material") else "Metal"
+    obj_sub_material = (
+        obj.get("botw_sub_material") if obj.get("botw_sub_material") else "Metal_Heavy"
+    )
+    obj_wall_code = (
+        obj.get("botw_wall_code") if obj.get("botw_wall_code") else "NoClimb"
+    )
+    obj_floor_code = (
+        obj.get("botw_floor_code") if obj.get("botw_floor_code") else "None"
+    )
+    obj_shape_type = (
+        obj.get("botw_shape_type") if obj.get("botw_shape_type") else "AUTO"
+    )
+
+    shapes = []
+    for shape_hull in hull_objects:
+        if not (shape_hull.name.split("_hull_")[0] == obj.name):
+            continue
+        vertices = hull_vertices(shape_hull)
+        shapes.append(
+            {
+                "object": shape_hull,
+                "name": shape_hull.name,
+                "vertices": vertices,
+                "center": bounding_box(vertices)[0],
+                "material": shape_hull.get("botw_material")
+                if shape_hull.get("botw_material")
+                else obj_material,
+                "sub_material": shape_hull.get("botw_sub_material")
+                if shape_hull.get("botw_sub_material")
+                else obj_sub_material,
+                "wall_code": shape_hull.get("botw_wall_code")
+                if shape_hull.get("botw_wall_code")
+                else obj_wall_code,
+                "floor_code": shape_hull.get("botw_floor_code")
+                if shape_hull.get("botw_floor_code")
+                else obj_floor_code,
+                "shape_type": shape_hull.get("botw_shape_type")
+                if shape_hull.get("botw_shape_type")
+                else obj_shape_type,
+            }
+        )
+    return shapes
+
+
+def partition_shapes(shapes: list, max_shapes: int, max_size: float) -> list:
+    # Median split along the longest axis until every part fits the limits,
+    # so each rigid body gets a tight box the broadphase can cull
+    if len(shapes) <= 1:
+        return [shapes]
+    extents = bounding_box([co for shape in shapes for co in shape["vertices"]])[1]
+    if (max_shapes <= 0 or len(shapes) <= max_shapes) and (
+        max_size <= 0.0 or max(extents) <= max_size
+    ):
+        return [shapes]
+    axis = max(range(3), key=lambda i: extents[i])
+    shapes = sorted(shapes, key=lambda shape: shape["center"][axis])
+    middle = len(shapes) // 2
+    return partition_shapes(shapes[:middle], max_shapes, max_size) + partition_shapes(
+        shapes[middle:], max_shapes, max_size
+    )
+
+
+def convex_hull(vertices) -> tuple:
+    bm = bmesh.new()
+    for co in vertices:
+        bm.verts.new(co)
+    try:
+        result = bmesh.ops.convex_hull(bm, input=bm.verts)
+        bmesh.ops.delete(
+            bm,
+            geom=result["geom_interior"] + result["geom_unused"],
+            context="VERTS",
+        )
+        volume = bm.calc_volume() if bm.faces else 0.0
+    except RuntimeError:
+        volume = 0.0
+    vertices = [v.co.copy() for v in bm.verts]
+    bm.free()
+    return vertices, abs(volume)
+
+
+def merge_shapes(
+    shapes: list,
+    threshold: float,
+    max_shapes: int,
+    max_vertices: int,
+    neighbours: int = 8,
+) -> list:
+    # Greedy pairwise merge: always take the pair whose merged hull adds the
+    # least empty volume. Candidates come from a k-d tree over the original
+    # hull centers, and a merged group inherits its members' neighbours.
+    # The error is measured against the summed volume of the original hulls,
+    # so empty space added by earlier merges counts against later ones.
+    if len(shapes) <= 1:
+        return shapes
+
+    kd = mathutils.kdtree.KDTree(len(shapes))
+    for i, shape in enumerate(shapes):
+        kd.insert(shape["center"], i)
+    kd.balance()
+
+    groups = {}
+    for i, shape in enumerate(shapes):
+        groups[i] = dict(
+            shape, solid_volume=convex_hull(shape["vertices"])[1], version=0
+        )
+    parent = list(range(len(shapes)))
+    adjacent = {i: set() for i in groups}
+    for i, shape in enumerate(shapes):
+        for _, j, _ in kd.find_n(shape["center"], neighbours + 1):
+            if j != i:
+                adjacent[i].add(j)
+                adjacent[j].add(i)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def same_params(a, b):
+        return all(
+            a[key] == b[key]
+            for key in (
+                "material",
+                "sub_material",
+                "wall_code",
+                "floor_code",
+                "shape_type",
+            )
+        )
+
+    def candidate(i, j):
+        a, b = groups[i], groups[j]
+        if not same_params(a, b):
+            return None
+        vertices, volume = convex_hull(a["vertices"] + b["vertices"])
+        if max_vertices > 0 and len(vertices) > max_vertices:
+            return None
+        solid_volume = a["solid_volume"] + b["solid_volume"]
+        error = (volume - solid_volume) / volume if volume else 0.0
+        return max(error, 0.0), vertices, solid_volume
+
+    heap = []
+    counter = itertools.count()
+
+    def push_candidates(i):
+        for j in {find(j) for j in adjacent[i]} - {i}:
+            entry = candidate(i, j)
+            if entry:
+                error, vertices, solid_volume = entry
+                heapq.heappush(
+                    heap,
+                    (
+                        error,
+                        next(counter),
+                        (i, groups[i]["version"]),
+                        (j, groups[j]["version"]),
+                        vertices,
+                        solid_volume,
+                    ),
+                )
+
+    for i in list(groups):
+        push_candidates(i)
+
+    while heap:
+        error, _, (i, version_i), (j, version_j), vertices, solid = heapq.heappop(heap)
+        if i not in groups or j not in groups:
+            continue
+        if groups[i]["version"] != version_i or groups[j]["version"] != version_j:
+            continue
+        if error > threshold and not (0 < max_shapes < len(groups)):
+            continue
+        groups.pop(j)
+        parent[j] = i
+        adjacent[i] |= adjacent.pop(j)
+        groups[i].update(
+            vertices=vertices,
+            solid_volume=solid,
+            center=bounding_box(vertices)[0],
+            version=version_i + 1,
+        )
+        push_candidates(i)
+
+    result = []
+    for i in sorted(groups):
+        shape = dict(groups[i])
+        del shape["solid_volume"], shape["version"]
+        result.append(shape)
+    return result
+
+
+def fit_primitive(vertices, shape_types, tolerance=None) -> dict:
+    # PCA frame of the hull points; every candidate primitive encloses the
+    # hull, so the empty volume it adds is the fitting error
+    hull_volume = convex_hull(vertices)[1]
+    if len(vertices) < 4 or hull_volume <= 0.0:
+        return None
+    points = np.array([tuple(co) for co in vertices], dtype=np.float64)
+    mean = points.mean(axis=0)
+    axes = np.linalg.eigh(np.cov(points - mean, rowvar=False))[1][:, ::-1].copy()
+    if np.linalg.det(axes) < 0.0:
+        axes[:, 2] = -axes[:, 2]
+    local = (points - mean) @ axes
+    lower, upper = local.min(axis=0), local.max(axis=0)
+    middle = (lower + upper) / 2
+    local -= middle
+    center = mathutils.Vector(mean + axes @ middle)
+
+    fits = []
+    if "BOX" in shape_types:
+        half_extents = (upper - lower) / 2
+        fits.append(
+            (
+                8.0 * np.prod(half_extents),
+                {
+                    "shape_type": "box",
+                    "translate_0": center,
+                    "half_extents": mathutils.Vector(half_extents),
+                    "rotate": mathutils.Matrix(axes.tolist()).to_euler("XYZ"),
+                },
+            )
+        )
+    if "SPHERE" in shape_types:
+        radius = float(np.linalg.norm(local, axis=1).max())
+        fits.append(
+            (
+                4.0 / 3.0 * pi * radius ** 3,
+                {"shape_type": "sphere", "radius": radius, "translate_0": center},
+            )
+        )
+    if "CAPSULE" in shape_types:
+        radial = np.linalg.norm(local[:, 1:], axis=1)
+        radius = float(radial.max())
+        cap = np.sqrt(np.maximum(radius ** 2 - radial ** 2, 0.0))
+        half_length = max(float((np.abs(local[:, 0]) - cap).max()), 0.0)
+        direction = mathutils.Vector(axes[:, 0])
+        fits.append(
+            (
+                pi * radius ** 2 * (2.0 * half_length + 4.0 / 3.0 * radius),
+                {
+                    "shape_type": "capsule",
+                    "radius": radius,
+                    "translate_0": center - direction * half_length,
+                    "translate_1": center + direction * half_length,
+                },
+            )
+        )
+    if not fits:
+        return None
+
+    volume, primitive = min(fits, key=lambda fit: fit[0])
+    if tolerance is not None and (volume - hull_volume) / volume > tolerance:
+        return None
+    return primitive
+
+
+def fit_shapes(shapes: list, fit_primitives: bool, tolerance: float) -> list:
+    for shape in shapes:
+        shape_type = shape["shape_type"]
+        if shape_type == "AUTO" and fit_primitives:
+            shape["primitive"] = fit_primitive(
+                shape["vertices"], ("BOX", "SPHERE", "CAPSULE"), tolerance
+            )
+        elif shape_type in ("BOX", "SPHERE", "CAPSULE"):
+            shape["primitive"] = fit_primitive(shape["vertices"], (shape_type,))
+        else:
+            shape["primitive"] = None
+    return shapes
+
+
+def shape_extent(shape) -> list:
+    # Points whose bounding box contains the shape as it is written, which
+    # for a primitive can reach outside the hull it was fitted to
+    primitive = shape.get("primitive")
+    if not primitive:
+        return shape["vertices"]
+    if primitive["shape_type"] == "box":
+        rotation = primitive["rotate"].to_matrix()
+        half_extents = primitive["half_extents"]
+        return [
+            primitive["translate_0"]
+            + rotation
+            @ mathutils.Vector(
+                (x * half_extents.x, y * half_extents.y, z * half_extents.z)
+            )
+            for x in (-1.0, 1.0)
+            for y in (-1.0, 1.0)
+            for z in (-1.0, 1.0)
+        ]
+    radius = mathutils.Vector((primitive["radius"],) * 3)
+    ends = [primitive["translate_0"], primitive.get("translate_1")]
+    ends = [co for co in ends if co is not None]
+    return [co + radius for co in ends] + [co - radius for co in ends]
+
+
+def shape_geometry(shape) -> tuple:
+    vertex_template = "                      vertex_{0}: !vec3 [{1}, {2}, {3}]"
+    vec3_template = "                      {0}: !vec3 [{1}, {2}, {3}]"
+    float_template = "                      {0}: {1}"
+
+    primitive = shape.get("primitive")
+    if not primitive:
+        return (
+            "polytope",
+            "                      vertex_num: {0}\n{1}".format(
+                len(shape["vertices"]),
+                "\n".join(
+                    [
+                        vertex_template.format(o, co.x, co.y, co.z)
+                        for o, co in enumerate(shape["vertices"])
+                    ]
+                ),
+            ),
+        )
+    return (
+        primitive["shape_type"],
+        "\n".join(
+            [
+                vec3_template.format(key, *value)
+                if isinstance(value, (mathutils.Vector, mathutils.Euler))
+                else float_template.format(key, value)
+                for key, value in primitive.items()
+                if key != "shape_type"
+            ]
+        ),
+    )
+
+
+def non_hull_meshes(objects) -> list:
+    return [
+        obj for obj in objects if (not ("_hull_" in obj.name)) and (obj.type == "MESH")
+    ]
+
+
+def build_rigid_bodies(
+    objects,
+    physics_type: str,
+    partition: bool = False,
+    partition_params: list = (16, 0.0),
+    merge: bool = False,
+    merge_params: list = (0.05, 0, 32),
+    fit_params: list = (False, 0.1),
+    owners: list = None,
+) -> tuple:
+    hull_objects = [obj for obj in objects if "_hull_" in obj.name]
+    object_names = {obj.name for obj in objects}
+    hulls = []
+    parts = []
+    for obj in owners if owners is not None else non_hull_meshes(objects):
+        shapes = collect_shapes(obj, hull_objects)
+        hulls += [shape["object"] for shape in shapes]
+        if merge:
+            shapes = merge_shapes(shapes, *merge_params)
+        shapes = fit_shapes(shapes, *fit_params)
+        if partition and physics_type == "FIXED":
+            obj_parts = partition_shapes(shapes, *partition_params)
+        else:
+            obj_parts = [shapes]
+        for part_index, part in enumerate(obj_parts):
+            if len(obj_parts) == 1:
+                parts.append((obj.name, part))
+                continue
+            # Part names must not clash with another object's rigid body
+            name = f"{obj.name}_{part_index}"
+            suffix = 1
+            while name in object_names:
+                name = f"{obj.name}_{part_index}.{suffix:03d}"
+                suffix += 1
+            parts.append((name, part))
+    return parts, hulls
+
+
+AAMP_HEADER_SIZE = 0x30
+AAMP_LIST_SIZE = 0xC
+AAMP_OBJECT_SIZE = 0x8
+AAMP_PARAMETER_SIZE = 0x8
+# Lists, objects and parameters of default.yml outside the rigid bodies
+AAMP_TEMPLATE_SIZE = 0x180
+# rigid_body_template without its name: 23 numeric parameters (4 of them
+# vec3) and 9 short strings
+AAMP_RIGID_BODY_SIZE = (
+    AAMP_LIST_SIZE
+    + AAMP_OBJECT_SIZE
+    + 23 * AAMP_PARAMETER_SIZE
+    + 4 * 12
+    + 19 * 4
+    + 9 * (AAMP_PARAMETER_SIZE + 16)
+)
+# Rigid bodies of weapon.yml and whether their shapes use the hull's
+# parameters ({1}) or the Undefined ones ({2})
+WEAPON_RIGID_BODIES = (
+    ("Body", False),
+    ("AtkPlayerBody", False),
+    ("AtkEnemyBody", False),
+    ("AtkNPCBody", False),
+    ("MainChemBody", True),
+    ("Body", False),
+)
+WEAPON_UNDEFINED_PARAMS = ("Undefined", "Undefined", "None", "None")
+
+
+def aamp_string_size(string: str) -> int:
+    return AAMP_PARAMETER_SIZE + (len(string.encode("utf-8")) + 4) // 4 * 4
+
+
+def estimate_shape_size(shape) -> int:
+    size = AAMP_OBJECT_SIZE + sum(
+        aamp_string_size(shape[key])
+        for key in ("material", "sub_material", "wall_code", "floor_code")
+    )
+    primitive = shape.get("primitive")
+    if not primitive:
+        return (
+            size
+            + aamp_string_size("polytope")
+            + AAMP_PARAMETER_SIZE
+            + 4
+            + len(shape["vertices"]) * (AAMP_PARAMETER_SIZE + 12)
+        )
+    return size + sum(
+        aamp_string_size(value)
+        if isinstance(value, str)
+        else AAMP_PARAMETER_SIZE
+        + (12 if isinstance(value, (mathutils.Vector, mathutils.Euler)) else 4)
+        for value in primitive.values()
+    )
+
+
+def estimate_binary_size(parts) -> int:
+    return (
+        AAMP_HEADER_SIZE
+        + AAMP_TEMPLATE_SIZE
+        + sum(
+            AAMP_RIGID_BODY_SIZE
+            + aamp_string_size(rigid_body_name)
+            + sum(estimate_shape_size(shape) for shape in shapes)
+            for rigid_body_name, shapes in parts
+        )
+    )
+
+
+def weapon_rigid_bodies(objects) -> list:
+    hulls = [obj for obj in objects if "_hull_" in obj.name]
+    keys = ("material", "sub_material", "wall_code", "floor_code")
+    return [
+        (
+            rigid_body_name,
+            [
+                dict(
+                    zip(
+                        keys,
+                        WEAPON_UNDEFINED_PARAMS
+                        if undefined
+                        else weapon_shape_params(hull),
+                    ),
+                    name=hull.name,
+                    vertices=hull_vertices(hull),
+                )
+                for hull in hulls
+            ],
+        )
+        for rigid_body_name, undefined in WEAPON_RIGID_BODIES
+    ]
+
+
+def estimate_physics(
+    self, context, parts, budgets: list, worst_offenders: int = 5, max_lines: int = 40
+):
+    max_vertices_per_hull, max_shapes_per_body, max_vertices, max_size = budgets
+
+    body_lines = []
+    total_shapes = 0
+    total_vertices = 0
+    for rigid_body_index, (rigid_body_name, shapes) in enumerate(parts):
+        primitives = sum(1 for shape in shapes if shape.get("primitive"))
+        vertices = sum(
+            len(shape["vertices"]) for shape in shapes if not shape.get("primitive")
+        )
+        body_lines.append(
+            f"RigidBody_{rigid_body_index} {rigid_body_name}: "
+            f"{len(shapes)} shapes ({primitives} primitives), {vertices} vertices"
+        )
+        total_shapes += len(shapes)
+        total_vertices += vertices
+    size = estimate_binary_size(parts)
+    summary = (
+        f"{len(parts)} rigid bodies, {total_shapes} shapes, "
+        f"{total_vertices} vertices, ~{size / 1024:.1f} KiB .bphysics"
+    )
+
+    hulls = sorted(
+        [
+            (shape["name"], len(shape["vertices"]))
+            for _, shapes in parts
+            for shape in shapes
+            if not shape.get("primitive")
+        ],
+        key=lambda hull: hull[1],
+        reverse=True,
+    )
+    bodies = sorted(
+        [(name, len(shapes)) for name, shapes in parts],
+        key=lambda body: body[1],
+        reverse=True,
+    )
+    offender_lines = [
+        "Largest hulls: "
+        + ", ".join(f"{name} ({count})" for name, count in hulls[:worst_offenders]),
+        "Largest bodies: "
+        + ", ".join(f"{name} ({count})" for name, count in bodies[:worst_offenders]),
+    ]
+
+    warnings = []
+    for items, budget, description in (
+        (hulls, max_vertices_per_hull, "hulls over {} vertices"),
+        (bodies, max_shapes_per_body, "rigid bodies over {} shapes"),
+    ):
+        over = [name for name, count in items if budget and count > budget]
+        if over:
+            warnings.append(
+                f"{len(over)} {description.format(budget)}: "
+                + ", ".join(over[:worst_offenders])
+                + (", ..." if len(over) > worst_offenders else "")
+            )
+    if max_vertices and total_vertices > max_vertices:
+        warnings.append(
+            f"{total_vertices} vertices exceed the budget of {max_vertices}"
+        )
+    if max_size and size > max_size * 1024:
+        warnings.append(f"~{size / 1024:.1f} KiB exceeds the budget of {max_size} KiB")
+
+    print("BotW physics estimate:")
+    for line in body_lines + ["Total: " + summary] + offender_lines:
+        print("  " + line)
+    for warning in warnings:
+        print("  Warning: " + warning)
+        self.report({"WARNING"}, warning)
+
+    # The console keeps the full breakdown, the popup is capped to stay on screen.
+    shown_lines = body_lines[:max_lines]
+    if len(body_lines) > max_lines:
+        shown_lines.append(f"... and {len(body_lines) - max_lines} more (see console)")
+
+    def draw(menu, context):
+        layout = menu.layout
+        for line in shown_lines:
+            layout.label(text=line)
+        layout.separator()
+        layout.label(text="Total: " + summary)
+        for line in offender_lines:
+            layout.label(text=line)
+        for warning in warnings:
+            layout.label(text=warning, icon="ERROR")
+
+    context.window_manager.popup_menu(
+        draw, title="BotW physics estimate", icon="ERROR" if warnings else "INFO"
+    )
+    self.report({"INFO"}, summary)
+    return {"FINISHED"}
+
+
+def read_template(physics_type: str) -> str:
+    script_file = os.path.realpath(__file__)
+    directory = os.path.dirname(script_file)
+    default_file = os.path.join(
+        directory, "weapon.yml" if physics_type == "WEAPON" else "default.yml"
+    )
+    with open(default_file, "r") as f:
+        return f.read()
+
+
+def weapon_shape_params(hull) -> tuple:
+    return (
+        hull.get("botw_material") if hull.get("botw_material") else "Metal",
+        hull.get("botw_sub_material")
+        if hull.get("botw_sub_material")
+        else "Metal_Heavy",
+        hull.get("botw_wall_code") if hull.get("botw_wall_code") else "None",
+        hull.get("botw_floor_code") if hull.get("botw_floor_code") else "None",
+    )
+
+
+def weapon_to_yaml(hulls) -> str:
+    vertex_template = "                      vertex_{0}: !vec3 [{1}, {2}, {3}]"
+
+    shape_template_metal = (
+        "                    ShapeParam_{0}: !obj\n"
+        "                      shape_type: !str32 polytope\n"
+        "                      vertex_num: {1}\n"
+        "{2}\n"
+        "                      material: !str32 {3}\n"
+        "                      sub_material: !str32 {4}\n"
+        "                      wall_code: !str32 {5}\n"
+        "                      floor_code: !str32 {6}\n"
+    )
+
+    shape_template_u = (
+        "                    ShapeParam_{0}: !obj\n"
+        "                      shape_type: !str32 polytope\n"
+        "                      vertex_num: {1}\n"
+        "{2}\n"
+        "                      material: !str32 Undefined\n"
+        "                      sub_material: !str32 Undefined\n"
+        "                      wall_code: !str32 None\n"
+        "                      floor_code: !str32 None\n"
+    )
+
+    shapes_metal = ""
+    shapes_u = ""
+    for i, hull in enumerate(hulls):
+        vertices = hull_vertices(hull)
+        shapes_metal += shape_template_metal.format(
+            i,
+            len(vertices),
+            "\n".join(
+                [
+                    vertex_template.format(o, co.x, co.y, co.z)
+                    for o, co in enumerate(vertices)
+                ]
+            ),
+            *weapon_shape_params(hull),
+        )
+        shapes_u += shape_template_u.format(
+            i,
+            len(vertices),
+            "\n".join(
+                [
+                    vertex_template.format(o, co.x, co.y, co.z)
+                    for o, co in enumerate(vertices)
+                ]
+            ),
+        )
+
+    return read_template("WEAPON").format(len(hulls), shapes_metal, shapes_u)
+
+
+def rigid_body_to_yaml(index: int, name: str, shapes: list, physics_type: str) -> str:
+    rigid_body_template = (
+        "                RigidBody_{0}: !list\n"
+        "                  objects:\n"
+        "                    948250248: !obj\n"
+        "                      rigid_body_name: !str64 {1}\n"
+        "                      mass: 10000.0\n"
+        "                      inertia: !vec3 [6666.67, 6666.67, 6666.67]\n"
+        "                      linear_damping: 0.0\n"
+        "                      angular_damping: 0.05\n"
+        "                      max_impulse: 10000.0\n"
+        "                      col_impulse_scale: 1.0\n"
+        "                      ignore_normal_for_impulse: false\n"
+        "                      volume: 8.0\n"
+        "                      toi: true\n"
+        "                      center_of_mass: !vec3 [0.0, 1.0, 0.0]\n"
+        "                      max_linear_velocity: 200.0\n"
+        "                      bounding_center: !vec3 [{7}, {8}, {9}]\n"
+        "                      bounding_extents: !vec3 [{10}, {11}, {12}]\n"
+        "                      max_angular_velocity_rad: 198.968\n"
+        "                      motion_type: !str32 {4}\n"
+        "                      contact_point_info: !str32 Body\n"
+        "                      collision_info: !str32 Body\n"
+        "                      bone: !str64 \n"
+        "                      water_buoyancy_scale: 1.0\n"
+        "                      water_flow_effective_rate: 1.0\n"
+        "                      layer: !str32 Entity{5}Object\n"
+        "                      no_hit_ground: false\n"
+        "                      no_hit_water: false\n"
+        "                      groundhit: !str32 HitAll\n"
+        "                      use_ground_hit_type_mask: false\n"
+        "                      no_char_standing_on: false\n"
+        "                      navmesh: !str32 {6}\n"
+        "                      navmesh_sub_material: !str32 \n"
+        "                      link_matrix: ''\n"
+        "                      magne_mass_scaling_factor: 1.0\n"
+        "                      always_character_mass_scaling: false\n"
+        "                      shape_num: {2}\n"
+        "{3}"
+        "                  lists: {{}}\n"
+    )
+
+    shape_param_template = (
+        "                    ShapeParam_{0}: !obj #{1}\n"
+        "                      shape_type: !str32 {2}\n"
+        "{3}\n"
+        "                      material: !str32 {4}\n"
+        "                      sub_material: !str32 {5}\n"
+        "                      wall_code: !str32 {6}\n"
+        "                      floor_code: !str32 {7}\n"
+    )
+
+    center, extents = bounding_box(
+        [co for shape in shapes for co in shape_extent(shape)]
+    )
+    return rigid_body_template.format(
+        index,
+        name,
+        len(shapes),
+        "".join(
+            [
+                shape_param_template.format(
+                    shape_index,
+                    shape["name"],
+                    *shape_geometry(shape),
+                    shape["material"],
+                    shape["sub_material"],
+                    shape["wall_code"],
+                    shape["floor_code"],
+                )
+                for shape_index, shape in enumerate(shapes)
+            ]
+        ),
+        physics_type.capitalize(),
+        "Ground" if physics_type.capitalize() == "Fixed" else "",
+        "STATIC_WALKABLE_AND_CUTTING"
+        if physics_type.capitalize() == "Fixed"
+        else "DYNAMIC_SILHOUETTE_AND_OBSTACLE",
+        *center,
+        *extents,
+    )
+
+
+def rigid_bodies_to_yaml(parts: list, physics_type: str) -> str:
+    rigid_bodies = "".join(
+        [
+            rigid_body_to_yaml(rigid_body_index, rigid_body_name, shapes, physics_type)
+            for rigid_body_index, (rigid_body_name, shapes) in enumerate(parts)
+        ]
+    )
+    return read_template(physics_type).format(len(parts), rigid_bodies.rstrip("\n"))
+
+
+def yaml_to_binary(filepath_yml: str, filepath_bin: str):
+    command = "aamp {} {}".format(filepath_yml, filepath_bin)
+    print(subprocess.check_output(command, shell=True))
+
+
 def generate_physics(
     self,
     context,
@@ -127,6 +1098,11 @@ def generate_physics(
     vhacd_params: list,
     remove_hulls_after_export: bool,
     binary: bool = False,
+    partition: bool = False,
+    partition_params: list = (16, 0.0),
+    merge: bool = False,
+    merge_params: list = (0.05, 0, 32),
+    fit_params: list = (False, 0.1),
 ):
     scene = bpy.context.scene
     if not scene.objects:
@@ -167,208 +1143,24 @@ def generate_physics(
     if binary:
         filepath_yml = filepath_yml + ".temp"
         filepath_bin = filepath + ".bphysics"
-    script_file = os.path.realpath(__file__)
-    directory = os.path.dirname(script_file)
-    default_file = os.path.join(
-        directory, "weapon.yml" if physics_type == "WEAPON" else "default.yml"
-    )
-    with open(default_file, "r") as f:
-        content = f.read()
 
     if physics_type == "WEAPON":
-        vertex_template = "                      vertex_{0}: !vec3 [{1}, {2}, {3}]"
-
-        shape_template_metal = (
-            "                    ShapeParam_{0}: !obj\n"
-            "                      shape_type: !str32 polytope\n"
-            "                      vertex_num: {1}\n"
-            "{2}\n"
-            "                      material: !str32 {3}\n"
-            "                      sub_material: !str32 {4}\n"
-            "                      wall_code: !str32 {5}\n"
-            "                      floor_code: !str32 {6}\n"
-        )
-
-        shape_template_u = (
-            "                    ShapeParam_{0}: !obj\n"
-            "                      shape_type: !str32 polytope\n"
-            "                      vertex_num: {1}\n"
-            "{2}\n"
-            "                      material: !str32 Undefined\n"
-            "                      sub_material: !str32 Undefined\n"
-            "                      wall_code: !str32 None\n"
-            "                      floor_code: !str32 None\n"
-        )
-
         hulls = [obj for obj in scene.objects if "_hull_" in obj.name]
-
-        shapes_metal = ""
-        shapes_u = ""
-        for i, hull in enumerate(hulls):
-            mtx = mathutils.Matrix.Rotation(radians(-90.0), 4, "X") @ hull.matrix_world
-            vertices = [mtx @ v.co for v in hull.data.vertices]
-            shapes_metal += shape_template_metal.format(
-                i,
-                len(vertices),
-                "\n".join(
-                    [
-                        vertex_template.format(o, co.x, co.y, co.z)
-                        for o, co in enumerate(vertices)
-                    ]
-                ),
-                hull.get("botw_material") if hull.get("botw_material") else "Metal",
-                hull.get("botw_sub_material")
-                if hull.get("botw_sub_material")
-                else "Metal_Heavy",
-                hull.get("botw_wall_code") if hull.get("botw_wall_code") else "None",
-                hull.get("botw_floor_code") if hull.get("botw_floor_code") else "None",
-            )
-            shapes_u += shape_template_u.format(
-                i,
-                len(vertices),
-                "\n".join(
-                    [
-                        vertex_template.format(o, co.x, co.y, co.z)
-                        for o, co in enumerate(vertices)
-                    ]
-                ),
-            )
-
-        output = content.format(len(hulls), shapes_metal, shapes_u)
+        output = weapon_to_yaml(hulls)
     elif physics_type in ("FIXED", "DYNAMIC"):
-        rigid_body_template = (
-            "                RigidBody_{0}: !list\n"
-            "                  objects:\n"
-            "                    948250248: !obj\n"
-            "                      rigid_body_name: !str64 {1}\n"
-            "                      mass: 10000.0\n"
-            "                      inertia: !vec3 [6666.67, 6666.67, 6666.67]\n"
-            "                      linear_damping: 0.0\n"
-            "                      angular_damping: 0.05\n"
-            "                      max_impulse: 10000.0\n"
-            "                      col_impulse_scale: 1.0\n"
-            "                      ignore_normal_for_impulse: false\n"
-            "                      volume: 8.0\n"
-            "                      toi: true\n"
-            "                      center_of_mass: !vec3 [0.0, 1.0, 0.0]\n"
-            "                      max_linear_velocity: 200.0\n"
-            "                      bounding_center: !vec3 [0.0, 1.0, 0.0]\n"
-            "                      bounding_extents: !vec3 [2.0, 2.0, 2.0]\n"
-            "                      max_angular_velocity_rad: 198.968\n"
-            "                      motion_type: !str32 {4}\n"
-            "                      contact_point_info: !str32 Body\n"
-            "                      collision_info: !str32 Body\n"
-            "                      bone: !str64 \n"
-            "                      water_buoyancy_scale: 1.0\n"
-            "                      water_flow_effective_rate: 1.0\n"
-            "                      layer: !str32 Entity{5}Object\n"
-            "                      no_hit_ground: false\n"
-            "                      no_hit_water: false\n"
-            "                      groundhit: !str32 HitAll\n"
-            "                      use_ground_hit_type_mask: false\n"
-            "                      no_char_standing_on: false\n"
-            "                      navmesh: !str32 {6}\n"
-            "                      navmesh_sub_material: !str32 \n"
-            "                      link_matrix: ''\n"
-            "                      magne_mass_scaling_factor: 1.0\n"
-            "                      always_character_mass_scaling: false\n"
-            "                      shape_num: {2}\n"
-            "{3}"
-            "                  lists: {{}}\n"
-        )
-
-        shape_param_template = (
-            "                    ShapeParam_{0}: !obj #{1}\n"
-            "                      shape_type: !str32 polytope\n"
-            "                      vertex_num: {2}\n"
-            "{3}\n"
-            "                      material: !str32 {4}\n"
-            "                      sub_material: !str32 {5}\n"
-            "                      wall_code: !str32 {6}\n"
-            "                      floor_code: !str32 {7}\n"
-        )
-
-        vertex_template = "                      vertex_{0}: !vec3 [{1}, {2}, {3}]"
-
-        result = ""
-
-        rigid_bodies = ""
-
-        non_hull_objects = [
-            obj
-            for obj in scene.objects
-            if (not ("_hull_" in obj.name)) and (obj.type == "MESH")
-        ]
-        if not non_hull_objects:
+        if not non_hull_meshes(scene.objects):
             self.report({"ERROR"}, "You need to keep the original mesh")
             return {"CANCELLED"}
-        non_hull_index = 0
-        hulls = []
-        for obj in non_hull_objects:
-            shape_hull_index = 0
-            shapes = ""
-            obj_material = (
-                obj.get("botw_material") if obj.get("botw_material") else "Metal"
-            )
-            obj_sub_material = (
-                obj.get("botw_sub_material")
-                if obj.get("botw_sub_material")
-                else "Metal_Heavy"
-            )
-            obj_wall_code = (
-                obj.get("botw_wall_code") if obj.get("botw_wall_code") else "NoClimb"
-            )
-            obj_floor_code = (
-                obj.get("botw_floor_code") if obj.get("botw_floor_code") else "None"
-            )
-            for shape_hull in set(scene.objects) - set(non_hull_objects):
-                if not (shape_hull.name.split("_hull_")[0] == obj.name):
-                    continue
-                hulls.append(shape_hull)
-                # fmt: off
-                mtx = (
-                    mathutils.Matrix.Rotation(radians(-90.0), 4, "X") \
-                    @ shape_hull.matrix_world
-                )
-                # fmt: on
-                verts = [mtx @ v.co for v in shape_hull.data.vertices]
-                shapes += shape_param_template.format(
-                    shape_hull_index,
-                    shape_hull.name,
-                    len(verts),
-                    "\n".join(
-                        [
-                            vertex_template.format(o, co.x, co.y, co.z)
-                            for o, co in enumerate(verts)
-                        ]
-                    ),
-                    shape_hull.get("botw_material")
-                    if shape_hull.get("botw_material")
-                    else obj_material,
-                    shape_hull.get("botw_sub_material")
-                    if shape_hull.get("botw_sub_material")
-                    else obj_sub_material,
-                    shape_hull.get("botw_wall_code")
-                    if shape_hull.get("botw_wall_code")
-                    else obj_wall_code,
-                    shape_hull.get("botw_floor_code")
-                    if shape_hull.get("botw_floor_code")
-                    else obj_floor_code,
-                )
-                shape_hull_index += 1
-            rigid_bodies += rigid_body_template.format(
-                non_hull_index,
-                obj.name,
-                shape_hull_index,
-                shapes,
-                physics_type.capitalize(),
-                "Ground" if physics_type.capitalize() == "Fixed" else "",
-                "STATIC_WALKABLE_AND_CUTTING"
-                if physics_type.capitalize() == "Fixed"
-                else "DYNAMIC_SILHOUETTE_AND_OBSTACLE",
-            )
-            non_hull_index += 1
-        output = content.format(non_hull_index, rigid_bodies.rstrip("\n"))
+        parts, hulls = build_rigid_bodies(
+            scene.objects,
+            physics_type,
+            partition,
+            partition_params,
+            merge,
+            merge_params,
+            fit_params,
+        )
+        output = rigid_bodies_to_yaml(parts, physics_type)
     else:
         self.report({"ERROR"}, "What have you done?")
         return {"CANCELLED"}
@@ -378,8 +1170,7 @@ def generate_physics(
 
     if binary:
         try:
-            command = "aamp {} {}".format(filepath_yml, filepath_bin)
-            print(subprocess.check_output(command, shell=True))
+            yaml_to_binary(filepath_yml, filepath_bin)
         except Exception as e:
             print(e)
             self.report(
@@ -397,6 +1188,239 @@ def generate_physics(
     return {"FINISHED"}
 
 
+watch_state = {}
+
+
+def botw_properties(obj) -> tuple:
+    return tuple(
+        sorted((key, str(obj[key])) for key in obj.keys() if key.startswith("botw_"))
+    )
+
+
+def hull_signature(hull) -> tuple:
+    coordinates = [0.0] * (len(hull.data.vertices) * 3)
+    hull.data.vertices.foreach_get("co", coordinates)
+    return (
+        hash(tuple(coordinates)),
+        tuple(tuple(row) for row in hull.matrix_world),
+        botw_properties(hull),
+    )
+
+
+def hull_layout(objects) -> dict:
+    layout = {obj.name: [] for obj in non_hull_meshes(objects)}
+    for obj in objects:
+        owner = obj.name.split("_hull_")[0]
+        if "_hull_" in obj.name and owner in layout:
+            layout[owner].append(obj.name)
+    return layout
+
+
+def owner_objects(objects, owner: str, layout: dict) -> list:
+    return [objects[owner]] + [objects[name] for name in layout[owner]]
+
+
+def owner_signature(owner_objects: list) -> tuple:
+    return (botw_properties(owner_objects[0]),) + tuple(
+        hull_signature(hull) for hull in owner_objects[1:]
+    )
+
+
+def replace_rigid_body(output: str, index: int, rigid_body: str) -> str:
+    header = "\n                RigidBody_{}: !list\n"
+    start = output.index(header.format(index)) + 1
+    end = output.find(header.format(index + 1), start)
+    if end == -1:
+        trailing = output[len(output.rstrip("\n")) :]
+        return output[:start] + rigid_body.rstrip("\n") + trailing
+    return output[:start] + rigid_body + output[end + 1 :]
+
+
+def write_watched_physics(output: str):
+    filepath_yml = watch_state["filepath_yml"]
+    with open(filepath_yml, "w") as output_file:
+        output_file.write(output)
+    if watch_state["filepath_bin"]:
+        try:
+            yaml_to_binary(filepath_yml, watch_state["filepath_bin"])
+        finally:
+            os.remove(filepath_yml)
+
+
+def export_watched_physics(scene):
+    # Build every object on its own so each one's rigid body indices are
+    # known; merging and partitioning are per object, so the result is the
+    # same as a regular export
+    objects = scene.objects
+    physics_type = watch_state["physics_type"]
+    layout = hull_layout(objects)
+    if physics_type == "WEAPON":
+        output = weapon_to_yaml([obj for obj in objects if "_hull_" in obj.name])
+        bodies = {}
+    else:
+        parts = []
+        bodies = {}
+        for owner in layout:
+            owner_parts = build_rigid_bodies(
+                objects,
+                physics_type,
+                **watch_state["options"],
+                owners=[objects[owner]],
+            )[0]
+            bodies[owner] = list(range(len(parts), len(parts) + len(owner_parts)))
+            parts += owner_parts
+        output = rigid_bodies_to_yaml(parts, physics_type)
+    write_watched_physics(output)
+    watch_state.update(
+        output=output,
+        layout=layout,
+        bodies=bodies,
+        signatures={
+            owner: owner_signature(owner_objects(objects, owner, layout))
+            for owner in layout
+        },
+    )
+    print(f"Physics watch: exported {watch_state['filepath']}")
+
+
+def update_watched_physics(scene):
+    objects = scene.objects
+    physics_type = watch_state["physics_type"]
+    layout = hull_layout(objects)
+    pending = watch_state["pending"]
+    watch_state["pending"] = set()
+    if physics_type == "WEAPON" or layout.keys() != watch_state["layout"].keys():
+        return export_watched_physics(scene)
+
+    changed = []
+    for owner in layout:
+        if owner not in pending and layout[owner] == watch_state["layout"][owner]:
+            continue
+        signature = owner_signature(owner_objects(objects, owner, layout))
+        if signature != watch_state["signatures"][owner]:
+            changed.append((owner, signature))
+    if not changed:
+        return
+
+    output = watch_state["output"]
+    for owner, signature in changed:
+        parts = build_rigid_bodies(
+            objects,
+            physics_type,
+            **watch_state["options"],
+            owners=[objects[owner]],
+        )[0]
+        indices = watch_state["bodies"][owner]
+        if len(parts) != len(indices):
+            return export_watched_physics(scene)
+        for rigid_body_index, (rigid_body_name, shapes) in zip(indices, parts):
+            output = replace_rigid_body(
+                output,
+                rigid_body_index,
+                rigid_body_to_yaml(
+                    rigid_body_index, rigid_body_name, shapes, physics_type
+                ),
+            )
+        watch_state["signatures"][owner] = signature
+    write_watched_physics(output)
+    watch_state.update(output=output, layout=layout)
+    print(
+        "Physics watch: updated "
+        + ", ".join(owner for owner, _ in changed)
+        + f" in {watch_state['filepath']}"
+    )
+
+
+def watch_timer():
+    if not is_watching():
+        return None
+    remaining = watch_state["deadline"] - time.monotonic()
+    if remaining > 0.0:
+        return remaining
+    scene = bpy.data.scenes.get(watch_state["scene"])
+    if scene is None:
+        print(f"Physics watch: scene {watch_state['scene']} no longer exists")
+        stop_watch()
+        return None
+    try:
+        update_watched_physics(scene)
+    except Exception as e:
+        print(f"Physics watch: {e}")
+    return None
+
+
+def watch_depsgraph_update(scene, depsgraph=None):
+    if scene.name != watch_state["scene"]:
+        return
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+    for update in depsgraph.updates:
+        data = update.id.original
+        if isinstance(data, bpy.types.Object):
+            watch_state["pending"].add(data.name.split("_hull_")[0])
+        elif isinstance(data, bpy.types.Mesh):
+            watch_state["pending"].update(
+                obj.name.split("_hull_")[0] for obj in scene.objects if obj.data == data
+            )
+        else:
+            continue
+        watch_state["deadline"] = time.monotonic() + watch_state["delay"]
+    if watch_state["pending"] and not bpy.app.timers.is_registered(watch_timer):
+        bpy.app.timers.register(watch_timer, first_interval=watch_state["delay"])
+
+
+def is_watching() -> bool:
+    return watch_depsgraph_update in bpy.app.handlers.depsgraph_update_post
+
+
+def start_watch(scene, filepath: str, binary: bool, physics_type: str, delay, options):
+    filepath = filepath.replace(".physics.yml", "").replace(".bphysics", "")
+    watch_state.clear()
+    watch_state.update(
+        filepath=filepath + (".bphysics" if binary else ".physics.yml"),
+        filepath_yml=filepath + (".physics.yml.temp" if binary else ".physics.yml"),
+        filepath_bin=filepath + ".bphysics" if binary else None,
+        scene=scene.name,
+        physics_type=physics_type,
+        options=options,
+        delay=delay,
+        deadline=0.0,
+        pending=set(),
+    )
+    export_watched_physics(scene)
+    bpy.app.handlers.depsgraph_update_post.append(watch_depsgraph_update)
+
+
+def stop_watch():
+    if is_watching():
+        bpy.app.handlers.depsgraph_update_post.remove(watch_depsgraph_update)
+    if bpy.app.timers.is_registered(watch_timer):
+        bpy.app.timers.unregister(watch_timer)
+    watch_state.clear()
+
+
+def export_collection(collection, filepath: str, binary: bool, options: dict) -> tuple:
+    physics_type = collection.botw_physics_type
+    objects = collection.all_objects
+    if not [obj for obj in objects if "_hull_" in obj.name]:
+        raise ValueError("No convex hulls found")
+    if physics_type == "WEAPON":
+        hulls = [obj for obj in objects if "_hull_" in obj.name]
+        output = weapon_to_yaml(hulls)
+        counts = (len(WEAPON_RIGID_BODIES), len(hulls))
+    else:
+        if not non_hull_meshes(objects):
+            raise ValueError("You need to keep the original mesh")
+        parts = build_rigid_bodies(objects, physics_type, **options)[0]
+        output = rigid_bodies_to_yaml(parts, physics_type)
+        counts = (len(parts), sum(len(shapes) for _, shapes in parts))
+
+    filepath = filepath.replace(".physics.yml", "").replace(".bphysics", "")
+    filepath_yml = filepath + (".physics.yml.temp" if binary else ".physics.yml")
+    with open(filepath_yml, "w") as output_file:
+        output_file.write(output)
+    return filepath_yml, filepath + ".bphysics" if binary else None, counts
+
+
 def change_extension(self, context):
     filepath = self.filepath.split("/")
     filename = filepath[-1]
@@ -405,6 +1429,136 @@ def change_extension(self, context):
     print(self.filepath)
 
 
+class ShapeOptions:
+    """Shape processing options shared by the physics operators"""
+
+    # Operators that run V-HACD cap merged hulls with its own vertex limit
+    merge_vertex_limit = "merge_max_vertices"
+
+    physics_type: EnumProperty(
+        name="Actor type",
+        description="Select actor type. Depending on what you select, a different file will be generated.",
+        items=(
+            (
+                "FIXED",
+                "Static/Structure",
+                "Static actor type (for buildings, static objects)",
+            ),
+            ("DYNAMIC", "Dynamic/Object", "Dynamic actor type (for moving actors)"),
+            ("WEAPON", "Weapon", "Weapon actor type (for swords)"),
+        ),
+        default="FIXED",
+    )
+
+    partition: BoolProperty(
+        name="Partition structures",
+        description="Split large static objects into multiple spatially compact rigid bodies so the game can cull them separately (Static/Structure only)",
+        default=False,
+    )
+
+    partition_max_shapes: IntProperty(
+        name="Max Shapes Per Body",
+        description="Maximum number of shapes in one rigid body (0 = unlimited)",
+        default=16,
+        min=0,
+        max=1024,
+    )
+
+    partition_max_size: FloatProperty(
+        name="Max Body Size",
+        description="Maximum bounding box edge length of one rigid body (0 = unlimited)",
+        default=0.0,
+        min=0.0,
+        max=10000.0,
+        subtype="DISTANCE",
+    )
+
+    merge: BoolProperty(
+        name="Merge hulls",
+        description="Combine neighbouring convex hulls with matching parameters when it barely changes the collision volume (Static/Structure and Dynamic/Object only)",
+        default=False,
+    )
+
+    merge_threshold: FloatProperty(
+        name="Max Volume Error",
+        description="Largest fraction of a merged hull's volume that may be empty space added by the merge",
+        default=0.05,
+        min=0.0,
+        max=1.0,
+        precision=3,
+        subtype="FACTOR",
+    )
+
+    merge_max_shapes: IntProperty(
+        name="Target Shapes Per Object",
+        description="Keep merging the cheapest pairs past the volume error until an object has at most this many shapes (0 = only use the volume error)",
+        default=0,
+        min=0,
+        max=1024,
+    )
+
+    merge_max_vertices: IntProperty(
+        name="Max Vertices Per Merged Hull",
+        description="Reject merges whose convex hull would have more vertices than this (0 = unlimited, ignored when exporting with V-HACD settings)",
+        default=32,
+        min=0,
+        max=1024,
+    )
+
+    fit_primitives: BoolProperty(
+        name="Fit primitives",
+        description="Export hulls that are close to a box, sphere or capsule as that primitive instead of a polytope (Static/Structure and Dynamic/Object only)",
+        default=False,
+    )
+
+    fit_tolerance: FloatProperty(
+        name="Fit Tolerance",
+        description="Largest fraction of a primitive's volume that may lie outside the hull it replaces",
+        default=0.1,
+        min=0.0,
+        max=1.0,
+        precision=3,
+        subtype="FACTOR",
+    )
+
+    def shape_options(self) -> dict:
+        return {
+            "partition": self.partition,
+            "partition_params": [self.partition_max_shapes, self.partition_max_size],
+            "merge": self.merge,
+            "merge_params": [
+                self.merge_threshold,
+                self.merge_max_shapes,
+                getattr(self, self.merge_vertex_limit),
+            ],
+            "fit_params": [self.fit_primitives, self.fit_tolerance],
+        }
+
+    def draw_shape_options(self, layout):
+        col = layout.column()
+        col.label(text="Partitioning Options:")
+        col.prop(self, "partition")
+        sub = col.column()
+        sub.enabled = self.partition and self.physics_type == "FIXED"
+        sub.prop(self, "partition_max_shapes")
+        sub.prop(self, "partition_max_size")
+
+        layout.separator()
+        col = layout.column()
+        col.label(text="Shape Options:")
+        col.prop(self, "merge")
+        sub = col.column()
+        sub.enabled = self.merge and self.physics_type != "WEAPON"
+        sub.prop(self, "merge_threshold")
+        sub.prop(self, "merge_max_shapes")
+        if self.merge_vertex_limit == "merge_max_vertices":
+            sub.prop(self, "merge_max_vertices")
+        col.prop(self, "fit_primitives")
+        sub = col.column()
+        sub.enabled = self.fit_primitives and self.physics_type != "WEAPON"
+        sub.prop(self, "fit_tolerance")
+
+
 class SelectParams(Operator):
     """Select various parameters for BotW physics meshes"""
 
@@ -529,6 +1683,23 @@ class SelectParams(Operator):
         default="None",
     )
 
+    shape_type: EnumProperty(
+        name="Shape Type",
+        description="Collision shape written for the object's hulls",
+        items=(
+            (
+                "AUTO",
+                "Auto",
+                "Use a primitive when it fits within the export tolerance",
+            ),
+            ("POLYTOPE", "Polytope", "Always export the convex hull"),
+            ("BOX", "Box", "Always export an oriented box"),
+            ("SPHERE", "Sphere", "Always export a sphere"),
+            ("CAPSULE", "Capsule", "Always export a capsule"),
+        ),
+        default="AUTO",
+    )
+
     def execute(self, context):
         try:
             selected_objs = bpy.context.selected_objects
@@ -540,6 +1711,10 @@ class SelectParams(Operator):
                 obj["botw_sub_material"] = self.sub_material
                 obj["botw_wall_code"] = self.wall_code
                 obj["botw_floor_code"] = self.floor_code
+                obj["botw_shape_type"] = self.shape_type
+                # Custom properties don't tag the depsgraph, so the physics
+                # watcher would not see the change otherwise
+                obj.update_tag()
             return {"FINISHED"}
         except Exception as e:
             print(e)
@@ -557,6 +1732,7 @@ class SelectParams(Operator):
         col.prop(self, "sub_material")
         col.prop(self, "wall_code")
         col.prop(self, "floor_code")
+        col.prop(self, "shape_type")
 
 
 class ImportPhysics(Operator, ImportHelper):
@@ -568,11 +1744,125 @@ class ImportPhysics(Operator, ImportHelper):
 
     filter_glob: StringProperty(default="*.yml;*.bphysics", options={"HIDDEN"})
 
+    use_cache: BoolProperty(
+        name="Use cache",
+        description="Reuse the decoded shapes of files that were imported before",
+        default=True,
+    )
+
+    lazy: BoolProperty(
+        name="Choose rigid bodies",
+        description="List the rigid bodies in the file and only load the chosen ones",
+        default=False,
+    )
+
+    def execute(self, context):
+        if self.lazy:
+            bpy.ops.botw.import_physics_bodies(
+                "INVOKE_DEFAULT", filepath=self.filepath, use_cache=self.use_cache
+            )
+            return {"FINISHED"}
+        return parse_physics(self, context, self.filepath, self.use_cache)
+
+    def draw(self, context):
+        layout = self.layout
+
+        col = layout.column()
+        col.prop(self, "use_cache")
+        col.prop(self, "lazy")
+        col.operator(PurgePhysicsCache.bl_idname, text="Purge cache")
+
+
+class PurgePhysicsCache(Operator):
+    """Remove all cached BotW physics imports"""
+
+    bl_idname = "botw.purge_physics_cache"
+    bl_label = "Purge BotW physics import cache"
+    bl_description = "Remove the decoded shapes cached by the physics file importer"
+
+    def execute(self, context):
+        return purge_physics_cache(self, context)
+
+
+class PhysicsBodyItem(PropertyGroup):
+    load: BoolProperty(name="Load", default=False)
+    index: IntProperty()
+    shape_num: IntProperty()
+    vertex_num: IntProperty()
+    materials: StringProperty()
+
+
+class BOTW_UL_physics_bodies(UIList):
+    def draw_item(
+        self, context, layout, data, item, icon, active_data, active_propname
+    ):
+        row = layout.row()
+        row.prop(item, "load", text=item.name)
+        row.label(
+            text=f"{item.shape_num} shapes, {item.vertex_num} vertices, "
+            f"{item.materials}"
+        )
+
+
+class ImportPhysicsBodies(Operator):
+    """Import chosen rigid bodies of a BotW Physics File"""
+
+    bl_idname = "botw.import_physics_bodies"
+    bl_label = "Import BotW physics rigid bodies"
+    bl_description = "Choose which rigid bodies of a physics file to import"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filepath: StringProperty(options={"HIDDEN"})
+    use_cache: BoolProperty(default=True, options={"HIDDEN"})
+    bodies: CollectionProperty(type=PhysicsBodyItem, options={"HIDDEN"})
+    active_body: IntProperty(options={"HIDDEN"})
+
     def execute(self, context):
-        return parse_physics(self, context, self.filepath)
+        if import_state.get("filepath") != self.filepath:
+            if index_physics_file(self, context, self.filepath, self.use_cache) is None:
+                return {"CANCELLED"}
+        selection = [item.index for item in self.bodies if item.load]
+        if not selection:
+            clear_import_state()
+            self.report({"ERROR"}, "No rigid bodies selected")
+            return {"CANCELLED"}
+        return load_rigid_bodies(self, context, selection)
+
+    def invoke(self, context, event):
+        index = index_physics_file(self, context, self.filepath, self.use_cache)
+        if index is None:
+            return {"CANCELLED"}
+        if not index:
+            clear_import_state()
+            self.report({"ERROR"}, "No rigid bodies found")
+            return {"CANCELLED"}
+        self.bodies.clear()
+        for i, entry in enumerate(index):
+            item = self.bodies.add()
+            item.name = entry["name"]
+            item.index = i
+            item.shape_num = entry["shape_num"]
+            item.vertex_num = entry["vertex_num"]
+            item.materials = ", ".join(entry["materials"])
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width=600)
 
+    def cancel(self, context):
+        clear_import_state()
 
-class ExportPhysics(Operator, ExportHelper):
+    def draw(self, context):
+        layout = self.layout
+        col = layout.column()
+        col.label(
+            text=f"{len(self.bodies)} rigid bodies in "
+            f"{bpy.path.basename(self.filepath)}"
+        )
+        col.template_list(
+            "BOTW_UL_physics_bodies", "", self, "bodies", self, "active_body", rows=12
+        )
+
+
+class ExportPhysics(Operator, ExportHelper, ShapeOptions):
     """Export BotW Physics File"""
 
     check_existing: BoolProperty(
@@ -586,6 +1876,7 @@ class ExportPhysics(Operator, ExportHelper):
     bl_label = "Export BotW physics file"
     bl_options = {"REGISTER", "PRESET"}
     filename_ext = ""
+    merge_vertex_limit = "maxNumVerticesPerCH"
 
     filter_glob: StringProperty(default="*.physics.yml;*.bphysics", options={"HIDDEN"})
 
@@ -596,21 +1887,6 @@ class ExportPhysics(Operator, ExportHelper):
         update=change_extension,
     )
 
-    physics_type: EnumProperty(
-        name="Actor type",
-        description="Select actor type. Depending on what you select, a different file will be generated.",
-        items=(
-            (
-                "FIXED",
-                "Static/Structure",
-                "Static actor type (for buildings, static objects)",
-            ),
-            ("DYNAMIC", "Dynamic/Object", "Dynamic actor type (for moving actors)"),
-            ("WEAPON", "Weapon", "Weapon actor type (for swords)"),
-        ),
-        default="FIXED",
-    )
-
     vhacd: BoolProperty(
         name="Use V-HACD",
         description="Auto-generate collision using V-HACD (Disable if generated manually)",
@@ -777,6 +2053,7 @@ class ExportPhysics(Operator, ExportHelper):
                 self.maxNumVerticesPerCH,
                 self.minVolumePerCH,
             ],
+            **self.shape_options(),
         )
 
     def draw(self, context):
@@ -788,6 +2065,9 @@ class ExportPhysics(Operator, ExportHelper):
         col.prop(self, "binary")
         col.prop(self, "vhacd")
 
+        layout.separator()
+        self.draw_shape_options(layout)
+
         layout.separator()
         col = layout.column()
         col.label(text="Pre-Processing Options:")
@@ -813,25 +2093,350 @@ class ExportPhysics(Operator, ExportHelper):
         col.prop(self, "minVolumePerCH")
 
 
+class EstimatePhysics(Operator, ShapeOptions):
+    """Estimate the size of a BotW physics export without writing it"""
+
+    bl_idname = "botw.estimate_physics"
+    bl_label = "Estimate BotW physics cost"
+    bl_description = "Count the rigid bodies, shapes and vertices an export of the existing hulls would write"
+    bl_options = {"REGISTER"}
+
+    max_vertices_per_hull: IntProperty(
+        name="Max Vertices Per Hull",
+        description="Warn about hulls with more vertices than this (0 = no budget)",
+        default=32,
+        min=0,
+    )
+
+    max_shapes_per_body: IntProperty(
+        name="Max Shapes Per Body",
+        description="Warn about rigid bodies with more shapes than this (0 = no budget)",
+        default=64,
+        min=0,
+    )
+
+    max_vertices: IntProperty(
+        name="Max Total Vertices",
+        description="Warn when the whole file has more vertices than this (0 = no budget)",
+        default=0,
+        min=0,
+    )
+
+    max_size: IntProperty(
+        name="Max File Size (KiB)",
+        description="Warn when the estimated .bphysics is larger than this (0 = no budget)",
+        default=0,
+        min=0,
+    )
+
+    def execute(self, context):
+        objects = context.scene.objects
+        if not [obj for obj in objects if "_hull_" in obj.name]:
+            self.report({"ERROR"}, "No convex hulls found")
+            return {"CANCELLED"}
+        if self.physics_type != "WEAPON" and not non_hull_meshes(objects):
+            self.report({"ERROR"}, "You need to keep the original mesh")
+            return {"CANCELLED"}
+        if self.physics_type == "WEAPON":
+            parts = weapon_rigid_bodies(objects)
+        else:
+            parts = build_rigid_bodies(
+                objects, self.physics_type, **self.shape_options()
+            )[0]
+        return estimate_physics(
+            self,
+            context,
+            parts,
+            budgets=[
+                self.max_vertices_per_hull,
+                self.max_shapes_per_body,
+                self.max_vertices,
+                self.max_size,
+            ],
+        )
+
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width=400)
+
+    def draw(self, context):
+        layout = self.layout
+
+        col = layout.column()
+        col.prop(self, "physics_type")
+
+        layout.separator()
+        self.draw_shape_options(layout)
+
+        layout.separator()
+        col = layout.column()
+        col.label(text="Budgets:")
+        col.prop(self, "max_vertices_per_hull")
+        col.prop(self, "max_shapes_per_body")
+        col.prop(self, "max_vertices")
+        col.prop(self, "max_size")
+
+
+class WatchPhysics(Operator, ExportHelper, ShapeOptions):
+    """Re-export BotW Physics File on every change"""
+
+    check_existing: BoolProperty(
+        name="Check existing",
+        description="Check and warn on overwriting existing files",
+        default=False,
+        options={"HIDDEN"},
+    )
+
+    bl_idname = "botw.watch_physics"
+    bl_label = "Watch BotW physics file"
+    bl_description = "Keep a physics file up to date with the existing hulls, re-exporting only the rigid bodies that change. Run again to stop"
+    filename_ext = ""
+
+    filter_glob: StringProperty(default="*.physics.yml;*.bphysics", options={"HIDDEN"})
+
+    binary: BoolProperty(
+        name="Binary",
+        description="Export as Binary Physics file (.bphysics)",
+        default=True,
+        update=change_extension,
+    )
+
+    delay: FloatProperty(
+        name="Delay",
+        description="Seconds to wait after the last edit before exporting",
+        default=0.3,
+        min=0.0,
+        max=10.0,
+        subtype="TIME",
+        unit="TIME",
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        if not [obj for obj in scene.objects if "_hull_" in obj.name]:
+            self.report({"ERROR"}, "No convex hulls found")
+            return {"CANCELLED"}
+        if self.physics_type != "WEAPON" and not non_hull_meshes(scene.objects):
+            self.report({"ERROR"}, "You need to keep the original mesh")
+            return {"CANCELLED"}
+        stop_watch()
+        try:
+            start_watch(
+                scene,
+                self.filepath,
+                self.binary,
+                self.physics_type,
+                self.delay,
+                self.shape_options(),
+            )
+        except Exception as e:
+            print(e)
+            stop_watch()
+            self.report({"ERROR"}, f"{e}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Watching {watch_state['filepath']}")
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        if is_watching():
+            filepath = watch_state["filepath"]
+            stop_watch()
+            self.report({"INFO"}, f"Stopped watching {filepath}")
+            return {"FINISHED"}
+        return ExportHelper.invoke(self, context, event)
+
+    def draw(self, context):
+        layout = self.layout
+
+        col = layout.column()
+        col.label(text="Physics Options:")
+        col.prop(self, "physics_type")
+        col.prop(self, "binary")
+        col.prop(self, "delay")
+
+        layout.separator()
+        self.draw_shape_options(layout)
+
+
+class ExportCollectionsPhysics(Operator, ShapeOptions):
+    """Export one BotW Physics File per collection"""
+
+    bl_idname = "botw.export_collections_physics"
+    bl_label = "Export BotW physics files per collection"
+    bl_description = "Export every collection with an actor type to its own physics file, converting them to binary in parallel"
+    bl_options = {"REGISTER", "PRESET"}
+
+    directory: StringProperty(subtype="DIR_PATH")
+
+    binary: BoolProperty(
+        name="Binary",
+        description="Export as Binary Physics files (.bphysics)",
+        default=True,
+    )
+
+    jobs: IntProperty(
+        name="Parallel Conversions",
+        description="Number of AAMP conversions to run at the same time",
+        default=4,
+        min=1,
+        max=64,
+    )
+
+    def execute(self, context):
+        collections = [
+            collection
+            for collection in bpy.data.collections
+            if collection.botw_physics_type != "NONE"
+        ]
+        if not collections:
+            self.report({"ERROR"}, "No collections have an actor type")
+            return {"CANCELLED"}
+
+        directory = bpy.path.abspath(self.directory)
+        options = self.shape_options()
+        summaries = {}
+        conversions = {}
+        failed = set()
+        for collection in collections:
+            filepath = (
+                bpy.path.abspath(collection.botw_physics_path)
+                if collection.botw_physics_path
+                else os.path.join(directory, bpy.path.clean_name(collection.name))
+            )
+            try:
+                filepath_yml, filepath_bin, counts = export_collection(
+                    collection, filepath, self.binary, options
+                )
+            except Exception as e:
+                print(e)
+                summaries[collection.name] = f"{collection.name}: {e}"
+                failed.add(collection.name)
+                continue
+            summaries[collection.name] = "{}: {} rigid bodies, {} shapes -> {}".format(
+                collection.name, *counts, filepath_bin or filepath_yml
+            )
+            if filepath_bin:
+                conversions[collection.name] = (filepath_yml, filepath_bin)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {
+                executor.submit(yaml_to_binary, *paths): name
+                for name, paths in conversions.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(e)
+                    summaries[name] = (
+                        f"{name}: Make sure you have AAMP installed (pip install aamp)"
+                    )
+                    failed.add(name)
+                finally:
+                    os.remove(conversions[name][0])
+
+        for name, summary in summaries.items():
+            print(summary)
+            self.report({"WARNING"} if name in failed else {"INFO"}, summary)
+        exported = len(collections) - len(failed)
+        self.report({"INFO"}, f"Exported {exported} of {len(collections)} collections")
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def draw(self, context):
+        layout = self.layout
+
+        col = layout.column()
+        col.label(text="Collections:")
+        for collection in bpy.data.collections:
+            box = col.box()
+            box.prop(collection, "botw_physics_type", text=collection.name)
+            if collection.botw_physics_type != "NONE":
+                box.prop(collection, "botw_physics_path", text="")
+
+        layout.separator()
+        col = layout.column()
+        col.label(text="Physics Options:")
+        col.prop(self, "binary")
+        col.prop(self, "jobs")
+
+        layout.separator()
+        self.draw_shape_options(layout)
+
+
 def MenuImport(self, context):
     self.layout.operator(ImportPhysics.bl_idname, text="BotW Physics File")
 
 
 def MenuExport(self, context):
     self.layout.operator(ExportPhysics.bl_idname, text="BotW Physics File")
+    self.layout.operator(
+        ExportCollectionsPhysics.bl_idname, text="BotW Physics Files (Collections)"
+    )
+    self.layout.operator(
+        EstimatePhysics.bl_idname, text="BotW Physics File (Cost Estimate)"
+    )
+    self.layout.operator(
+        WatchPhysics.bl_idname,
+        text="BotW Physics File (Stop Watching)"
+        if is_watching()
+        else "BotW Physics File (Watch)",
+    )
 
 
 def register():
     bpy.utils.register_class(SelectParams)
     bpy.utils.register_class(ImportPhysics)
+    bpy.utils.register_class(PurgePhysicsCache)
+    bpy.utils.register_class(PhysicsBodyItem)
+    bpy.utils.register_class(BOTW_UL_physics_bodies)
+    bpy.utils.register_class(ImportPhysicsBodies)
     bpy.utils.register_class(ExportPhysics)
+    bpy.utils.register_class(EstimatePhysics)
+    bpy.utils.register_class(WatchPhysics)
+    bpy.utils.register_class(ExportCollectionsPhysics)
+    bpy.types.Collection.botw_physics_type = EnumProperty(
+        name="Actor type",
+        description="Actor type of the physics file exported for this collection",
+        items=(
+            ("NONE", "Don't export", "Skip this collection"),
+            (
+                "FIXED",
+                "Static/Structure",
+                "Static actor type (for buildings, static objects)",
+            ),
+            ("DYNAMIC", "Dynamic/Object", "Dynamic actor type (for moving actors)"),
+            ("WEAPON", "Weapon", "Weapon actor type (for swords)"),
+        ),
+        default="NONE",
+    )
+    bpy.types.Collection.botw_physics_path = StringProperty(
+        name="Output path",
+        description="Physics file exported for this collection (defaults to the collection name in the chosen directory)",
+        subtype="FILE_PATH",
+    )
     bpy.types.TOPBAR_MT_file_import.append(MenuImport)
     bpy.types.TOPBAR_MT_file_export.append(MenuExport)
 
 
 def unregister():
+    stop_watch()
+    clear_import_state()
     bpy.utils.unregister_class(SelectParams)
     bpy.utils.unregister_class(ImportPhysics)
+    bpy.utils.unregister_class(PurgePhysicsCache)
+    bpy.utils.unregister_class(ImportPhysicsBodies)
+    bpy.utils.unregister_class(BOTW_UL_physics_bodies)
+    bpy.utils.unregister_class(PhysicsBodyItem)
     bpy.utils.unregister_class(ExportPhysics)
+    bpy.utils.unregister_class(EstimatePhysics)
+    bpy.utils.unregister_class(WatchPhysics)
+    bpy.utils.unregister_class(ExportCollectionsPhysics)
+    del bpy.types.Collection.botw_physics_type
+    del bpy.types.Collection.botw_physics_path
     bpy.types.TOPBAR_MT_file_import.remove(MenuImport)
     bpy.types.TOPBAR_MT_file_export.remove(MenuExport)